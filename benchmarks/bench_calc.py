@@ -0,0 +1,20 @@
+import random
+
+from harness import benchmark
+
+
+@benchmark("calc.calculate", requires=("flet",))
+def bench_calculate(ctx):
+    from calc import CalculatorApp
+
+    app = CalculatorApp()
+    rng = random.Random(0)
+    operations = [
+        (rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), rng.choice("+-*/"))
+        for _ in range(10000)
+    ]
+
+    def run():
+        for operand1, operand2, operator in operations:
+            app.calculate(operand1, operand2, operator)
+    return run
@@ -0,0 +1,148 @@
+import os
+
+import generators
+from harness import benchmark
+
+
+def _prepare_dbs(ctx):
+    status_db = ctx.path("cycle_status.db")
+    master_db = ctx.path("port_master.db")
+    if not os.path.exists(status_db):
+        generators.write_cycle_dbs(status_db, master_db, n_ports=ctx.scale["ports"], days=ctx.scale["days"])
+    return status_db, master_db
+
+
+@benchmark("cycle.ingest", requires=("pandas",))
+def bench_ingest(ctx):
+    # 1日分のポーリングを save_status で追記する
+    import pandas as pd
+
+    import cycle
+
+    db_name = ctx.path("cycle_ingest.db")
+    columns = [c for c in cycle.STATUS_COLUMNS if c != 'timestamp']
+    polls = [
+        (now, pd.DataFrame([row[:-1] for row in rows], columns=columns))
+        for now, rows in generators.cycle_status_polls(n_ports=ctx.scale["ports"], days=1)
+    ]
+
+    def run():
+        if os.path.exists(db_name):
+            os.remove(db_name)
+        for now, df in polls:
+            cycle.save_status(df, db_name, now=now)
+    return run
+
+
+@benchmark("cycle.query", requires=("pandas",))
+def bench_query(ctx):
+    import cycle
+
+    status_db, master_db = _prepare_dbs(ctx)
+    return lambda: cycle.pivot_by_area(cycle.load_merged(status_db, master_db))
+
+
+@benchmark("cycle.render", requires=("pandas", "matplotlib", "seaborn", "japanize_matplotlib"))
+def bench_render(ctx):
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import cycle
+
+    status_db, master_db = _prepare_dbs(ctx)
+    df_pivot = cycle.pivot_by_area(cycle.load_merged(status_db, master_db))
+    output_path = ctx.path("cycle_render.png")
+    return lambda: cycle.plot_by_area(df_pivot, output_path)
+
+
+@benchmark("cycle.query_parquet", requires=("pandas", "pyarrow"))
+def bench_query_parquet(ctx):
+    import cycle
+    import cycle_parquet
+
+    status_db, master_db = _prepare_dbs(ctx)
+    parquet_dir = ctx.path("parquet")
+    cycle_parquet.export_cycle_status(status_db, f"{parquet_dir}/cycle_status/default")
+    cycle_parquet.export_port_master(master_db, f"{parquet_dir}/port_master.parquet")
+    return lambda: cycle.pivot_by_area(cycle_parquet.load_merged(parquet_dir=parquet_dir))
+
+
+@benchmark("cycle.stream")
+def bench_stream(ctx):
+    # 1日分のポーリングを StationMonitor に流す
+    import cycle_stream
+
+    polls = list(generators.cycle_status_polls(n_ports=ctx.scale["ports"], days=1))
+
+    def run():
+        monitor = cycle_stream.StationMonitor(lambda event: None)
+        for now, rows in polls:
+            for row in rows:
+                monitor.update(row[0], now, row[4], row[2])
+    return run
+
+
+@benchmark("cycle.ingest_delta", requires=("pandas",))
+def bench_ingest_delta(ctx):
+    # cycle.ingest と同じ1日分を、変化したポートだけ書く形式で保存する
+    import pandas as pd
+
+    import cycle
+    import cycle_delta
+
+    db_name = ctx.path("cycle_ingest_delta.db")
+    columns = [c for c in cycle.STATUS_COLUMNS if c != 'timestamp']
+    polls = [
+        (now, pd.DataFrame([row[:-1] for row in rows], columns=columns))
+        for now, rows in generators.cycle_status_polls(n_ports=ctx.scale["ports"], days=1)
+    ]
+
+    def run():
+        if os.path.exists(db_name):
+            os.remove(db_name)
+        for now, df in polls:
+            cycle_delta.save_status_delta(df, db_name, now=now)
+    return run
+
+
+def _check_delta_round_trip(ctx):
+    # ポートが抜けたり戻ったりするDBで、migrate -> read_series が元の表と一致することを確かめる
+    import sqlite3
+
+    import pandas as pd
+
+    import cycle
+    import cycle_delta
+
+    status_db = ctx.path("cycle_status_dropout.db")
+    delta_db = ctx.path("cycle_delta_dropout.db")
+    generators.write_cycle_dbs(status_db, ctx.path("port_master_dropout.db"), n_ports=20, days=2, dropout=0.1)
+    if os.path.exists(delta_db):
+        os.remove(delta_db)
+    cycle_delta.migrate(status_db, delta_db)
+
+    conn = sqlite3.connect(status_db)
+    try:
+        expected = pd.read_sql("SELECT * FROM cycle_status", conn)
+    finally:
+        conn.close()
+    expected = expected.sort_values(['timestamp', 'id'], ignore_index=True)[cycle.STATUS_COLUMNS]
+    for start, end in [("2026-01-01", "2026-01-03"), ("2026-01-01 10:07:00", "2026-01-01 18:00:00")]:
+        actual = cycle_delta.read_series(delta_db, start, end)
+        window = expected[(expected['timestamp'] >= pd.Timestamp(start).strftime(cycle.TIMESTAMP_FORMAT))
+                          & (expected['timestamp'] < pd.Timestamp(end).strftime(cycle.TIMESTAMP_FORMAT))]
+        pd.testing.assert_frame_equal(actual, window.reset_index(drop=True), check_dtype=False)
+    # ポーリングの無い期間は空になる
+    assert cycle_delta.read_series(delta_db, "2026-02-01", "2026-02-02").empty
+
+
+@benchmark("cycle.reconstruct_delta", requires=("pandas",))
+def bench_reconstruct_delta(ctx):
+    import cycle_delta
+
+    _check_delta_round_trip(ctx)
+    status_db, _ = _prepare_dbs(ctx)
+    delta_db = ctx.path("cycle_delta.db")
+    if not os.path.exists(delta_db):
+        cycle_delta.migrate(status_db, delta_db)
+    return lambda: cycle_delta.read_series(delta_db, "2026-01-02", "2026-01-04")
@@ -0,0 +1,25 @@
+import generators
+from harness import benchmark
+
+
+@benchmark("rebalance.plan", requires=("pandas", "numpy"))
+def bench_plan(ctx):
+    import pandas as pd
+
+    import rebalance
+
+    n_ports = ctx.scale["ports"]
+    df_ports = pd.DataFrame(
+        generators.port_master_rows(n_ports), columns=['id', 'name', 'address', 'lat', 'lng', 'elevation', 'area_type']
+    )
+    for _, rows in generators.cycle_status_polls(n_ports=n_ports, days=1):
+        pass
+    df_snapshot = pd.DataFrame(rows, columns=[
+        'id', 'address', 'num_bikes_parkable', 'num_bikes_now', 'num_bikes_rentalable', 'num_bikes_limit', 'timestamp'
+    ])
+
+    def run():
+        # 距離行列はキャッシュせず毎回計算する
+        distances = rebalance.DistanceCache(path=None).get(df_ports)
+        rebalance.plan_moves(df_ports, df_snapshot, distances)
+    return run
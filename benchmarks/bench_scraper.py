@@ -0,0 +1,18 @@
+import generators
+from harness import benchmark
+
+
+@benchmark("scraper.parse", requires=("bs4", "requests"))
+def bench_parse(ctx):
+    import scraper
+
+    pages = [
+        generators.github_listing_html(n_repos=ctx.scale["repos_per_page"], page=page)
+        for page in range(1, ctx.scale["pages"] + 1)
+    ]
+
+    def run():
+        seen_repos = set()
+        for html in pages:
+            scraper.parse_repositories(html, seen_repos)
+    return run
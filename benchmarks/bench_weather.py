@@ -0,0 +1,48 @@
+import os
+
+import generators
+from harness import benchmark
+
+
+@benchmark("weather.parse")
+def bench_parse(ctx):
+    import forecast
+
+    payload = generators.jma_forecast_payload(n_areas=ctx.scale["jma_areas"])
+    return lambda: forecast.extract_forecasts(payload)
+
+
+@benchmark("weather.ingest")
+def bench_ingest(ctx):
+    # アプリと同じく1行ずつ save_forecast する
+    import database
+    import forecast
+
+    database.DB_PATH = ctx.path("weather_ingest.db")
+    payload = generators.jma_forecast_payload(n_areas=ctx.scale["jma_areas"])
+    report_datetime, rows = forecast.extract_forecasts(payload)
+
+    def run():
+        if os.path.exists(database.DB_PATH):
+            os.remove(database.DB_PATH)
+        database.init_db()
+        for area_code, area_name, target_date, weather, pop in rows:
+            database.save_forecast("130000", area_code, report_datetime, target_date, weather, pop)
+    return run
+
+
+@benchmark("weather.query")
+def bench_query(ctx):
+    import database
+
+    database.DB_PATH = ctx.path("weather_history.db")
+    generators.write_forecast_db(
+        database.DB_PATH, years=ctx.scale["forecast_years"], n_areas=ctx.scale["forecast_areas"]
+    )
+    dates = database.get_historical_dates_by_office("130000")[:30]
+
+    def run():
+        database.get_historical_dates_by_office("130000")
+        for date in dates:
+            database.get_forecasts_by_office_and_date("130000", date)
+    return run
@@ -0,0 +1,18 @@
+import os
+
+import generators
+from harness import benchmark
+
+
+@benchmark("join.weather_cycle", requires=("pandas",))
+def bench_weather_cycle(ctx):
+    # 貸出状況の全期間を1回なめて、雨の有無・標高別に集計する
+    import weather_join
+
+    weather_db = ctx.path("join_weather.db")
+    status_db = ctx.path("join_status.db")
+    master_db = ctx.path("join_master.db")
+    if not os.path.exists(status_db):
+        generators.write_forecast_db(weather_db, years=1, n_areas=3)
+        generators.write_cycle_dbs(status_db, master_db, n_ports=ctx.scale["ports"], days=ctx.scale["days"])
+    return lambda: weather_join.usage_by_weather(status_db, weather_db, master_db)
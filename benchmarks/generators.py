@@ -0,0 +1,214 @@
+"""ベンチマーク用の合成データ生成
+
+どの関数も seed を受け取り、同じ引数なら同じデータを返す。
+"""
+import datetime
+import math
+import random
+import sqlite3
+
+WEATHER_TEXTS = [
+    "晴れ", "くもり", "雨", "晴れ　時々　くもり", "くもり　時々　雨",
+    "くもり　後　晴れ", "雨　後　くもり", "雪", "くもり　夕方　から　雨",
+]
+LANGUAGES = ["Python", "Go", "Java", "C++", "TypeScript", "JavaScript", "Kotlin", "Rust", "Dart", "Shell"]
+
+# 文京区あたりの範囲
+BUNKYO_LAT = (35.700, 35.740)
+BUNKYO_LNG = (139.725, 139.775)
+
+
+def jma_forecast_payload(n_areas=50, n_days=3, office_code="130000", report_datetime=None, seed=0):
+    """気象庁 forecast/{code}.json と同じ形の予報JSONを作る"""
+    rng = random.Random(seed)
+    report_datetime = report_datetime or datetime.datetime(2026, 1, 7, 5, 0, 0)
+    time_defines = [
+        (report_datetime + datetime.timedelta(days=i)).strftime("%Y-%m-%dT00:00:00+09:00")
+        for i in range(n_days)
+    ]
+    pop_defines = [
+        (report_datetime + datetime.timedelta(hours=6 * i)).strftime("%Y-%m-%dT%H:00:00+09:00")
+        for i in range(n_days * 2)
+    ]
+
+    weather_areas = []
+    pop_areas = []
+    for i in range(n_areas):
+        area = {"code": f"{office_code[:3]}{i + 10:03d}", "name": f"合成地方{i}"}
+        weather_areas.append({
+            "area": area,
+            "weatherCodes": ["100"] * n_days,
+            "weathers": [rng.choice(WEATHER_TEXTS) for _ in range(n_days)],
+        })
+        pop_areas.append({
+            "area": area,
+            "pops": [str(rng.randrange(0, 101, 10)) for _ in range(n_days * 2)],
+        })
+
+    return [{
+        "publishingOffice": "気象庁",
+        "reportDatetime": report_datetime.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+        "timeSeries": [
+            {"timeDefines": time_defines, "areas": weather_areas},
+            {"timeDefines": pop_defines, "areas": pop_areas},
+        ],
+    }]
+
+
+def forecast_history(years=1, n_areas=10, office_code="130000", reports_per_day=3, seed=0):
+    """forecasts テーブルの行 (office_code, area_code, report_datetime, target_date, weather, pop, fetch_timestamp) を返す"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 1, 1)
+    areas = [f"{office_code[:3]}{i + 10:03d}" for i in range(n_areas)]
+    hours = [5, 11, 17][:reports_per_day]
+    for day in range(int(365 * years)):
+        base = start + datetime.timedelta(days=day)
+        for hour in hours:
+            report = base.replace(hour=hour)
+            report_text = report.strftime("%Y-%m-%dT%H:%M:%S+09:00")
+            for area_code in areas:
+                for offset in range(3):
+                    target_date = (base + datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+                    yield (
+                        office_code, area_code, report_text, target_date,
+                        rng.choice(WEATHER_TEXTS), rng.randrange(0, 101, 10), report.isoformat(),
+                    )
+
+
+def write_forecast_db(path, years=1, n_areas=10, office_code="130000", seed=0):
+    # database.init_db() と同じスキーマで履歴を書き込む
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS areas (code TEXT PRIMARY KEY, name TEXT NOT NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS forecasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            office_code TEXT,
+            area_code TEXT,
+            report_datetime TEXT,
+            target_date TEXT,
+            weather TEXT,
+            pop INTEGER,
+            fetch_timestamp TEXT,
+            FOREIGN KEY (area_code) REFERENCES areas (code),
+            UNIQUE(office_code, area_code, target_date, report_datetime)
+        )
+    """)
+    conn.executemany(
+        "INSERT OR REPLACE INTO areas (code, name) VALUES (?, ?)",
+        [(f"{office_code[:3]}{i + 10:03d}", f"合成地方{i}") for i in range(n_areas)],
+    )
+    conn.executemany("""
+        INSERT OR REPLACE INTO forecasts
+        (office_code, area_code, report_datetime, target_date, weather, pop, fetch_timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, forecast_history(years, n_areas, office_code, seed=seed))
+    conn.commit()
+    conn.close()
+
+
+def port_master_rows(n_ports=100, seed=0):
+    """port_master の行 (id, name, address, lat, lng, elevation, area_type) を返す"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_ports):
+        elevation = round(rng.uniform(2.0, 30.0), 1)
+        if elevation >= 20:
+            area_type = '高い'
+        elif elevation >= 10:
+            area_type = '普通'
+        else:
+            area_type = '低い'
+        rows.append((
+            str(6000 + i), f"合成ポート{i}", f"東京都文京区合成町{i % 9 + 1}-{i}",
+            rng.uniform(*BUNKYO_LAT), rng.uniform(*BUNKYO_LNG), elevation, area_type,
+        ))
+    return rows
+
+
+def cycle_status_polls(n_ports=100, days=30, interval_minutes=15, start=None, seed=0, dropout=0.0):
+    """15分おきのポーリング結果を (timestamp, [cycle_status の行, ...]) で順に返す
+
+    夜間はほとんど変化せず、日中に台数が動くようにしている。
+    dropout を指定すると、各ポートがその確率でそのポーリングの結果から抜ける。
+    """
+    rng = random.Random(seed)
+    # 抜けるポートは別の乱数で決め、dropout=0 のときの結果を変えない
+    dropout_rng = random.Random(seed + 1)
+    start = start or datetime.datetime(2026, 1, 1)
+    masters = port_master_rows(n_ports, seed)
+    limits = [rng.randint(4, 20) for _ in range(n_ports)]
+    bikes = [rng.randint(0, limit) for limit in limits]
+    n_polls = days * 24 * 60 // interval_minutes
+
+    for poll in range(n_polls):
+        now = start + datetime.timedelta(minutes=interval_minutes * poll)
+        # 日中ほど動きやすい
+        activity = 0.05 + 0.45 * max(0.0, math.sin(math.pi * (now.hour - 5) / 16))
+        rows = []
+        for i, (port_id, _, address, _, _, elevation, _) in enumerate(masters):
+            if rng.random() < activity:
+                # 標高の高いポートほど自転車が減りやすい。満車・空に張り付かないよう半分に寄せる
+                p_down = 0.5 + (elevation - 15) / 200 + (bikes[i] / limits[i] - 0.5) * 0.4
+                drift = -1 if rng.random() < p_down else 1
+                bikes[i] = min(limits[i], max(0, bikes[i] + drift))
+            rentalable = max(0, bikes[i] - (1 if bikes[i] and rng.random() < 0.05 else 0))
+            if dropout and dropout_rng.random() < dropout:
+                continue
+            rows.append((
+                port_id, address, limits[i] - bikes[i], bikes[i], rentalable, limits[i],
+                now.strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+        yield now, rows
+
+
+def write_cycle_dbs(status_path, master_path, n_ports=100, days=30, seed=0, dropout=0.0):
+    # ノートブックで作る DB と同じ列構成で書き込む
+    conn = sqlite3.connect(master_path)
+    conn.execute("DROP TABLE IF EXISTS port_master")
+    conn.execute("""
+        CREATE TABLE port_master (
+            "id" TEXT, "name" TEXT, "address" TEXT, "lat" REAL, "lng" REAL, "elevation" REAL, "area_type" TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO port_master VALUES (?, ?, ?, ?, ?, ?, ?)", port_master_rows(n_ports, seed))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(status_path)
+    conn.execute("DROP TABLE IF EXISTS cycle_status")
+    conn.execute("""
+        CREATE TABLE cycle_status (
+            "id" TEXT, "address" TEXT, "num_bikes_parkable" INTEGER, "num_bikes_now" INTEGER,
+            "num_bikes_rentalable" INTEGER, "num_bikes_limit" INTEGER, "timestamp" TEXT
+        )
+    """)
+    for _, rows in cycle_status_polls(n_ports, days, seed=seed, dropout=dropout):
+        conn.executemany("INSERT INTO cycle_status VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def github_listing_html(n_repos=30, page=1, seed=0):
+    """GitHub の organization リポジトリ一覧ページに似たHTMLを作る"""
+    rng = random.Random(seed + page)
+    items = []
+    for i in range(n_repos):
+        name = f"repo-{page:03d}-{i:03d}"
+        stars = rng.randint(0, 90000)
+        star_text = f"{stars / 1000:.1f}k" if stars >= 1000 else str(stars)
+        items.append(f"""
+<li class="Box-row">
+  <div class="d-flex">
+    <h3><a href="/google/{name}" itemprop="name codeRepository">{name}</a></h3>
+    <p class="color-fg-muted">Synthetic repository {i} for benchmarking.</p>
+    <div class="f6 color-fg-muted">
+      <span itemprop="programmingLanguage">{rng.choice(LANGUAGES)}</span>
+      <a href="/google/{name}/stargazers">{star_text}</a>
+      <a href="/google/{name}/forks">{rng.randint(0, 5000)}</a>
+      <span>Updated {rng.randint(1, 28)} days ago</span>
+    </div>
+  </div>
+</li>""")
+    return f"""<!DOCTYPE html>
+<html><head><title>google repositories</title></head>
+<body><div class="application-main"><ul data-filterable-for="your-repos-filter">{''.join(items)}</ul></div></body></html>"""
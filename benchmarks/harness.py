@@ -0,0 +1,81 @@
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各サブプロジェクトのソースを import できるようにする
+PROJECT_PATHS = [
+    os.path.join(ROOT_DIR, "lecture6", "weather-forecast", "src"),
+    os.path.join(ROOT_DIR, "lecture7"),
+    os.path.join(ROOT_DIR, "lecture-1"),
+    os.path.join(ROOT_DIR, "lecture-4", "calculator", "src"),
+]
+
+# データ量のプリセット
+SCALES = {
+    "small": {
+        "jma_areas": 50, "forecast_years": 1, "forecast_areas": 10,
+        "ports": 50, "days": 7, "repos_per_page": 30, "pages": 5,
+    },
+    "medium": {
+        "jma_areas": 200, "forecast_years": 3, "forecast_areas": 20,
+        "ports": 500, "days": 30, "repos_per_page": 30, "pages": 30,
+    },
+    "large": {
+        "jma_areas": 500, "forecast_years": 5, "forecast_areas": 30,
+        "ports": 2000, "days": 90, "repos_per_page": 30, "pages": 100,
+    },
+}
+
+BENCHMARKS = {}
+
+
+def add_project_paths():
+    for path in PROJECT_PATHS:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def benchmark(name, requires=()):
+    """ベンチマークを登録するデコレーター
+
+    関数は Context を受け取って準備をし、計測対象の引数なし関数を返す。
+    requires に書いたモジュールが無い環境ではスキップする。
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, tuple(requires))
+        return func
+    return decorator
+
+
+class Context:
+    def __init__(self, scale_name, tmpdir):
+        self.scale_name = scale_name
+        self.scale = SCALES[scale_name]
+        self.tmpdir = tmpdir
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+
+def missing_modules(requires):
+    return [m for m in requires if importlib.util.find_spec(m) is None]
+
+
+def measure(target, repeat):
+    # 1回目はウォームアップとして捨てる
+    target()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        target()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "repeat": repeat,
+    }
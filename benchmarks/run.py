@@ -0,0 +1,87 @@
+"""リポジトリ全体のベンチマークを実行する
+
+    python benchmarks/run.py                  # small で全ベンチマークを実行し baseline と比較
+    python benchmarks/run.py --scale medium   # データ量を増やす
+    python benchmarks/run.py --save           # 結果を baseline として保存
+    python benchmarks/run.py weather cycle.query   # 名前の前方一致で絞り込み
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import harness
+
+# ベンチマークの登録
+import bench_calc  # noqa: F401
+import bench_cycle  # noqa: F401
+import bench_rebalance  # noqa: F401
+import bench_scraper  # noqa: F401
+import bench_weather  # noqa: F401
+import bench_weather_join  # noqa: F401
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ベンチマークを実行して baseline と比較する")
+    parser.add_argument("names", nargs="*", help="実行するベンチマーク名（前方一致）")
+    parser.add_argument("--scale", choices=sorted(harness.SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="結果を baseline に保存する")
+    parser.add_argument("--threshold", type=float, default=0.2, help="この割合以上遅くなったら退行とみなす")
+    args = parser.parse_args(argv)
+
+    harness.add_project_paths()
+    baseline = load_baseline(args.baseline)
+    scale_baseline = baseline.get(args.scale, {})
+
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ctx = harness.Context(args.scale, tmpdir)
+        for name, (func, requires) in sorted(harness.BENCHMARKS.items()):
+            if args.names and not any(name.startswith(n) for n in args.names):
+                continue
+            missing = harness.missing_modules(requires)
+            if missing:
+                print(f"{name:<24} skipped (missing: {', '.join(missing)})")
+                continue
+
+            result = harness.measure(func(ctx), args.repeat)
+            results[name] = result
+
+            line = f"{name:<24} median {result['median'] * 1000:9.2f} ms  min {result['min'] * 1000:9.2f} ms"
+            previous = scale_baseline.get(name)
+            if previous:
+                ratio = result["min"] / previous["min"]
+                line += f"  ({ratio:.2f}x baseline)"
+                if ratio > 1 + args.threshold:
+                    regressions.append(name)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.save:
+        scale_baseline.update(results)
+        baseline[args.scale] = scale_baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline を保存しました: {args.baseline}")
+
+    if regressions:
+        print(f"退行: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
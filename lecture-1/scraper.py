@@ -0,0 +1,131 @@
+import re
+import sqlite3
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://github.com/orgs/google/repositories"
+
+# データの並び順を決める設定
+BASE_PARAMS = {
+    "q": "",
+    "type": "all",
+    "language": "",
+    "sort": "name"
+}
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def parse_star_count(raw_star):
+    raw_star = raw_star.replace(',', '').replace(' ', '')
+    try:
+        if 'k' in raw_star:
+            return int(float(raw_star.replace('k', '')) * 1000)
+        return int(raw_star)
+    except ValueError:
+        return 0
+
+
+def parse_repositories(html, seen_repos=None):
+    """リポジトリ一覧ページのHTMLから (名前, 言語, スター数) のリストを取り出す"""
+    if seen_repos is None:
+        seen_repos = set()
+    soup = BeautifulSoup(html, 'html.parser')
+
+    repos = []
+    for item in soup.find_all(['li', 'div']):
+        # ① 名前
+        name_tag = item.select_one("h3 a") or item.select_one("a[itemprop='name codeRepository']")
+        if not name_tag:
+            continue
+
+        repo_name = name_tag.get_text(strip=True)
+        # ゴミデータの除外
+        if not repo_name or repo_name.isdigit() or re.match(r'^\d+(\.\d+)?k?$', repo_name):
+            continue
+        if repo_name in seen_repos:
+            continue
+
+        # ② 言語
+        language = "N/A"
+        lang_tag = item.find(class_="ReposListItem-module__Box_9--RH81p")
+        # バックアップ（もしクラス名が変わっていた時のため）
+        if not lang_tag:
+            lang_tag = item.select_one("span[itemprop='programmingLanguage']")
+
+        if lang_tag:
+            if lang_tag.get("itemprop") == "programmingLanguage":
+                language = lang_tag.get_text(strip=True)
+            else:
+                # 親要素のテキストから抽出
+                parent_text = lang_tag.parent.get_text(" ", strip=True)
+                for trash in ["Updated", "Built", "License", "View"]:
+                    if trash in parent_text:
+                        parent_text = parent_text.split(trash)[0]
+
+                parts = parent_text.strip().split()
+                candidates = [w for w in parts if not any(c.isdigit() for c in w) and len(w) > 1]
+                if candidates:
+                    language = candidates[0]
+
+        # ③ スター数
+        star_count = 0
+        star_tag = item.select_one("a[href$='stargazers']")
+        if star_tag:
+            star_count = parse_star_count(star_tag.get_text(strip=True))
+
+        seen_repos.add(repo_name)
+        repos.append((repo_name, language, star_count))
+
+    return repos
+
+
+def scrape(db_name="google_repos.db", max_pages=100):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repositories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            language TEXT,
+            stars INTEGER
+        )
+    ''')
+    conn.commit()
+
+    seen_repos = set()
+    total_count = 0
+    try:
+        for current_page in range(1, max_pages + 1):
+            params = BASE_PARAMS.copy()
+            params['page'] = current_page
+            print(f"\n--- Page {current_page} を取得中... ---")
+
+            try:
+                time.sleep(1)
+                response = requests.get(BASE_URL, params=params, headers=HEADERS)
+                if response.status_code != 200:
+                    print(f"❌ 通信エラー: {response.status_code}")
+                    break
+
+                repos = parse_repositories(response.content, seen_repos)
+                if not repos:
+                    print(">> 有効なリポジトリが見つかりません。終了します。")
+                    break
+
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO repositories (name, language, stars)
+                    VALUES (?, ?, ?)
+                ''', repos)
+                conn.commit()
+                total_count += len(repos)
+            except Exception as e:
+                print(f"エラー: {e}")
+                break
+    finally:
+        conn.close()
+    print(f"完了: 合計 {total_count} 件をデータベースに保存しました。")
+
+if __name__ == "__main__":
+    scrape()
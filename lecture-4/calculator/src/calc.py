@@ -205,4 +205,5 @@ def main(page: ft.Page):
     page.add(calc)
 
 
-ft.app(main)
+if __name__ == "__main__":
+    ft.app(main)
@@ -1,15 +1,61 @@
+import hashlib
 import sqlite3
+import queue
+from contextlib import contextmanager
 from datetime import datetime
 import os
+import pathlib
+import perf
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "weather.db")
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    # ファイルへの書き込みを確実に見えるようにするため設定を変更
-    conn.execute("PRAGMA journal_mode = DELETE")
+def get_connection(check_same_thread=True, read_only=False):
+    # read_only=True のときは書き込みもロックの取得もできない接続にする
+    database = pathlib.Path(os.path.abspath(DB_PATH)).as_uri() + "?mode=ro" if read_only else DB_PATH
+    # 計測有効時はSQLごとの実行回数と時間を記録する接続を使う
+    factory = perf.TimedConnection if perf.ENABLED else sqlite3.Connection
+    # 読み取り専用の接続は自動コミットにして、暗黙のトランザクションでロックを持ち続けないようにする
+    conn = sqlite3.connect(
+        database, factory=factory, check_same_thread=check_same_thread, uri=read_only,
+        isolation_level=None if read_only else "",
+    )
+    if not read_only:
+        # ファイルへの書き込みを確実に見えるようにするため設定を変更
+        conn.execute("PRAGMA journal_mode = DELETE")
     return conn
 
+class ConnectionPool:
+    """複数スレッドから使い回す読み取り専用の接続のプール。with pool.connection() as conn: の形で借りる"""
+
+    def __init__(self, size=4):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(get_connection(check_same_thread=False, read_only=True))
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+@contextmanager
+def _reading(conn=None):
+    # 接続が渡されればそれを使い、なければその場で開いて閉じる
+    if conn is not None:
+        yield conn
+        return
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
 def init_db():
     conn = get_connection()
     try:
@@ -53,8 +99,8 @@ def save_area(code, name):
         cursor.execute("INSERT OR REPLACE INTO areas (code, name) VALUES (?, ?)", (code, name))
         conn.commit()
 
-def get_areas():
-    with get_connection() as conn:
+def get_areas(conn=None):
+    with _reading(conn) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT code, name FROM areas")
         return cursor.fetchall()
@@ -70,8 +116,8 @@ def save_forecast(office_code, area_code, report_datetime, target_date, weather,
         """, (office_code, area_code, report_datetime, target_date, weather, pop, fetch_timestamp))
         conn.commit()
 
-def get_forecasts_by_office_and_date(office_code, target_date):
-    with get_connection() as conn:
+def get_forecasts_by_office_and_date(office_code, target_date, conn=None):
+    with _reading(conn) as conn:
         cursor = conn.cursor()
         # 最新の発表時刻のデータを取得する。その支庁に紐づく全エリア分。
         cursor.execute("""
@@ -87,8 +133,8 @@ def get_forecasts_by_office_and_date(office_code, target_date):
         """, (office_code, target_date, office_code, target_date))
         return cursor.fetchall()
 
-def get_historical_dates_by_office(office_code):
-    with get_connection() as conn:
+def get_historical_dates_by_office(office_code, conn=None):
+    with _reading(conn) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT DISTINCT target_date 
@@ -98,6 +144,17 @@ def get_historical_dates_by_office(office_code):
         """, (office_code,))
         return [row[0] for row in cursor.fetchall()]
 
+def get_data_version(conn=None):
+    # 予報の追加・更新やエリア名の変更で変わる値。応答キャッシュの無効化に使う
+    with _reading(conn) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id) FROM forecasts")
+        forecasts_version = cursor.fetchone()[0]
+        # エリアは百件ほどなので、中身をそのまま要約する
+        cursor.execute("SELECT group_concat(code || ':' || name, '|') FROM (SELECT code, name FROM areas ORDER BY code)")
+        areas = cursor.fetchone()[0] or ""
+        return f"{forecasts_version}-{hashlib.sha1(areas.encode('utf-8')).hexdigest()[:8]}"
+
 if __name__ == "__main__":
     init_db()
     print("Database initialized.")
@@ -0,0 +1,37 @@
+import perf
+
+
+def extract_areas(weather_data):
+    """予報JSONに載っている全エリアの (エリアコード, エリア名)。天気の無いエリアも含む"""
+    ts_weather = weather_data[0]["timeSeries"][0]
+    return [(x["area"]["code"], x["area"]["name"]) for x in ts_weather["areas"]]
+
+
+@perf.timed_function("extract_forecasts")
+def extract_forecasts(weather_data):
+    """気象庁の予報JSONから (エリアコード, エリア名, 対象日, 天気, 降水確率) の行を取り出す"""
+    report = weather_data[0]
+    report_datetime = report["reportDatetime"]
+    ts_weather = report["timeSeries"][0]
+    ts_pop = report["timeSeries"][1] if len(report["timeSeries"]) > 1 else None
+
+    # エリアごとの降水確率を先に引けるようにしておく
+    pops_by_area = {}
+    if ts_pop:
+        for x in ts_pop["areas"]:
+            pops_by_area.setdefault(x["area"]["code"], x.get("pops", []))
+
+    time_defines = ts_weather["timeDefines"]
+    rows = []
+    for area_data in ts_weather["areas"]:
+        sub_area_code = area_data["area"]["code"]
+        sub_area_name = area_data["area"]["name"]
+        weathers = area_data.get("weathers", [])
+        pops = pops_by_area.get(sub_area_code, [])
+
+        for idx, w_text in enumerate(weathers):
+            target_date = time_defines[idx][:10] # YYYY-MM-DD
+            pop_val = int(pops[idx]) if len(pops) > idx and pops[idx] else None
+            rows.append((sub_area_code, sub_area_name, target_date, w_text, pop_val))
+
+    return report_datetime, rows
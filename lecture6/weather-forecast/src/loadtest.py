@@ -0,0 +1,99 @@
+# server.py に多数のクライアントから同時にリクエストを送り、スループットと遅延を測る
+#
+#   python server.py &
+#   python loadtest.py --clients 200 --requests 20000
+#
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import urlencode
+
+import perf
+
+
+async def _request(reader, writer, path, etag=None):
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost"]
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("サーバーが接続を閉じました")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("etag")
+
+
+async def _client(host, port, paths, n_requests, use_etag, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for _ in range(n_requests):
+            path = random.choice(paths)
+            start = time.perf_counter()
+            status, etag = await _request(reader, writer, path, etags.get(path) if use_etag else None)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[path] = etag
+    finally:
+        writer.close()
+
+
+def _paths():
+    # 実際にある支庁と日付からリクエスト先を作る
+    import database
+
+    paths = ["/areas"]
+    with database.get_connection() as conn:
+        offices = [row[0] for row in conn.execute("SELECT DISTINCT office_code FROM forecasts ORDER BY office_code")]
+    for office_code in offices:
+        for target_date in database.get_historical_dates_by_office(office_code)[:3]:
+            paths.append("/forecasts?" + urlencode({"office_code": office_code, "target_date": target_date}))
+        paths.append("/dates?" + urlencode({"office_code": office_code}))
+    return paths
+
+
+async def run(host, port, clients, requests, use_etag):
+    paths = _paths()
+    latencies = []
+    statuses = {}
+    per_client = max(1, requests // clients)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(host, port, paths, per_client, use_etag, latencies, statuses) for _ in range(clients)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests / {clients} clients / {elapsed:.2f} s")
+    print(f"{len(latencies) / elapsed:.0f} req/s")
+    for p in (50, 95, 99):
+        print(f"p{p}: {perf.percentile(latencies, p) * 1000:.2f} ms")
+    print(f"max: {latencies[-1] * 1000:.2f} ms")
+    print(f"status: {dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server.py の負荷試験")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--etag", action="store_true", help="If-None-Match を付けて 304 を返させる")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.clients, args.requests, args.etag))
+
+
+if __name__ == "__main__":
+    main()
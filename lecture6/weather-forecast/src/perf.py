@@ -0,0 +1,206 @@
+import atexit
+import csv
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# WEATHER_PERF=1 のときだけ計測する。未設定なら decorator / context manager はほぼ何もしない
+ENABLED = os.environ.get("WEATHER_PERF", "") not in ("", "0")
+# 結果の出力先 (.json か .csv)。未設定なら出力しない
+OUTPUT_PATH = os.environ.get("WEATHER_PERF_OUT", "")
+
+# ステージ名 -> 経過時間(秒)のリスト
+_samples = {}
+# SQL文 -> [実行回数, 合計時間(秒)]。合計時間は execute と結果の fetch を合わせたもの
+_sql_stats = {}
+_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    with _lock:
+        _samples.setdefault(stage, []).append(seconds)
+
+
+def record_sql(sql, seconds, executed=True):
+    # 空白の違いで別の文として数えないように正規化する。
+    # executed=False は結果の取り出しにかかった時間で、実行回数には数えない
+    key = " ".join(sql.split())
+    with _lock:
+        stat = _sql_stats.setdefault(key, [0, 0.0])
+        if executed:
+            stat[0] += 1
+        stat[1] += seconds
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def _timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """with perf.timed("fetch"): ... の形でブロックの時間を計測する"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _timer(stage)
+
+
+def timed_function(stage=None):
+    """関数全体の時間を計測するデコレーター。無効時は元の関数をそのまま返す"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        name = stage or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class TimedCursor(sqlite3.Cursor):
+    # SELECT は行の多くを fetch のときに作るので、取り出しの時間も直前の文に足す
+    _last_sql = None
+
+    def execute(self, sql, parameters=()):
+        self._last_sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._last_sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._last_sql is not None:
+                record_sql(self._last_sql, time.perf_counter() - start, executed=False)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __next__(self):
+        return self._timed_fetch(super().__next__)
+
+
+class TimedConnection(sqlite3.Connection):
+    # sqlite3.connect(..., factory=TimedConnection) で使う
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+
+def percentile(sorted_values, p):
+    # 最近傍順位法。sorted_values はソート済みであること
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summary():
+    """ステージごとの p50/p95/p99 と SQL の実行回数・時間をまとめて返す"""
+    with _lock:
+        samples = {stage: sorted(values) for stage, values in _samples.items()}
+        sql_stats = {sql: list(stat) for sql, stat in _sql_stats.items()}
+
+    stages = {}
+    for stage, values in samples.items():
+        stages[stage] = {
+            "count": len(values),
+            "total_ms": sum(values) * 1000,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+
+    sql = {}
+    for statement, (count, total) in sql_stats.items():
+        sql[statement] = {
+            "count": count,
+            "total_ms": total * 1000,
+            "mean_ms": total / count * 1000,
+        }
+    return {"stages": stages, "sql": sql}
+
+
+def format_summary():
+    # デバッグパネル表示用の短いテキスト
+    result = summary()
+    lines = []
+    for stage, s in sorted(result["stages"].items()):
+        lines.append(
+            f"{stage}: n={s['count']} p50={s['p50_ms']:.1f}ms "
+            f"p95={s['p95_ms']:.1f}ms p99={s['p99_ms']:.1f}ms"
+        )
+    for statement, s in sorted(result["sql"].items(), key=lambda x: -x[1]["total_ms"]):
+        lines.append(f"SQL x{s['count']} {s['total_ms']:.1f}ms: {statement[:60]}")
+    return "\n".join(lines)
+
+
+def dump(path=None):
+    """計測結果をファイルに書き出す。拡張子が .csv なら CSV、それ以外は JSON"""
+    path = path or OUTPUT_PATH
+    if not path:
+        return
+    result = summary()
+    if path.endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", "count", "total_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for stage, s in result["stages"].items():
+                writer.writerow(["stage", stage, s["count"], s["total_ms"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"]])
+            for statement, s in result["sql"].items():
+                writer.writerow(["sql", statement, s["count"], s["total_ms"], "", "", "", ""])
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if ENABLED and OUTPUT_PATH:
+    atexit.register(dump)
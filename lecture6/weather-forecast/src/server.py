@@ -0,0 +1,230 @@
+# weather.db の予報を JSON で返す読み取り専用の HTTP サーバー
+#
+#   python server.py --port 8000
+#
+#   GET /areas
+#   GET /forecasts?office_code=130000&target_date=2026-01-07
+#   GET /dates?office_code=130000
+#
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+POOL_SIZE = 4
+# 予報・エリアが更新されたかを確認する間隔(秒)。この間は同じバージョンとみなす
+VERSION_CHECK_INTERVAL = 1.0
+MAX_HEADER_LINES = 100
+MAX_CACHE_ENTRIES = 10000
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+def _param(params, name):
+    values = params.get(name)
+    if not values or not values[0]:
+        raise HttpError(400, f"{name} を指定してください")
+    return values[0]
+
+
+def _areas(params, conn):
+    return [{"code": code, "name": name} for code, name in database.get_areas(conn)]
+
+
+def _forecasts(params, conn):
+    rows = database.get_forecasts_by_office_and_date(_param(params, "office_code"), _param(params, "target_date"), conn)
+    return [
+        {"area_code": area_code, "area_name": area_name, "weather": weather, "pop": pop, "report_datetime": report_dt}
+        for area_code, area_name, weather, pop, report_dt in rows
+    ]
+
+
+def _dates(params, conn):
+    return database.get_historical_dates_by_office(_param(params, "office_code"), conn)
+
+
+ROUTES = {
+    "/areas": _areas,
+    "/forecasts": _forecasts,
+    "/dates": _dates,
+}
+
+
+class ForecastService:
+    """DB への問い合わせ結果を、データのバージョンごとにキャッシュする"""
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.pool = database.ConnectionPool(pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.cache = {}
+        self.in_flight = {}
+        self.version = None
+        self.version_checked_at = 0.0
+
+    def _run(self, func, *args):
+        def call():
+            with self.pool.connection() as conn:
+                return func(*args, conn)
+        return asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def current_version(self):
+        now = time.monotonic()
+        if now - self.version_checked_at >= VERSION_CHECK_INTERVAL:
+            self.version_checked_at = now
+            version = await self._run(database.get_data_version)
+            if version != self.version:
+                # 新しい予報やエリアの変更が入ったらキャッシュを捨てる
+                self.version = version
+                self.cache.clear()
+        return self.version
+
+    async def get(self, path, params):
+        """(本文, ETag) を返す"""
+        handler = ROUTES.get(path)
+        if handler is None:
+            raise HttpError(404, f"{path} は存在しません")
+
+        version = await self.current_version()
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # 同じキーの問い合わせが同時に来たら、DB へは1回だけ問い合わせる
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            data = await self._run(handler, params)
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            etag = '"%s-%s"' % (version, hashlib.sha1(body).hexdigest()[:16])
+            result = (body, etag)
+            if version == self.version:
+                if len(self.cache) >= MAX_CACHE_ENTRIES:
+                    # 一番古いものから捨てる
+                    del self.cache[next(iter(self.cache))]
+                self.cache[key] = result
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # 待っている側がいなくても警告が出ないよう、ここで取り出しておく
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.close()
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "不正なリクエストです")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def _response(status, body=b"", headers=None, keep_alive=True):
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+    headers = dict(headers or {})
+    headers.setdefault("Content-Length", str(len(body)))
+    headers["Connection"] = "keep-alive" if keep_alive else "close"
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def handle_client(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                if method != "GET":
+                    raise HttpError(405, "GET のみ対応しています")
+
+                url = urlsplit(target)
+                body, etag = await service.get(url.path, parse_qs(url.query))
+                if headers.get("if-none-match") == etag:
+                    writer.write(_response(304, headers={"ETag": etag}, keep_alive=keep_alive))
+                else:
+                    writer.write(_response(200, body, {
+                        "Content-Type": "application/json; charset=utf-8",
+                        "ETag": etag,
+                        "Cache-Control": "no-cache",
+                    }, keep_alive=keep_alive))
+            except HttpError as e:
+                body = json.dumps({"error": e.message}, ensure_ascii=False).encode("utf-8")
+                writer.write(_response(e.status, body, {"Content-Type": "application/json; charset=utf-8"}, keep_alive))
+            except Exception as e:
+                print(f"Error handling request: {e}")
+                writer.write(_response(500, keep_alive=False))
+                keep_alive = False
+
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, pool_size=POOL_SIZE):
+    service = ForecastService(pool_size)
+    server = await asyncio.start_server(lambda r, w: handle_client(service, r, w), host, port, backlog=1024)
+    print(f"http://{host}:{port} で待ち受けています")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="weather.db の予報を返す HTTP サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import flet as ft
 import requests
 import database
+import forecast
+import perf
 from datetime import datetime
 
 AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
@@ -29,6 +31,21 @@ def main(page: ft.Page):
     )
     current_area_code = None
 
+    # WEATHER_PERF=1 のときだけ表示する計測結果パネル
+    perf_text = ft.Text("", size=11, selectable=True)
+    perf_panel = ft.ExpansionTile(
+        title=ft.Text("計測結果 (デバッグ)"),
+        controls=[perf_text],
+        visible=perf.ENABLED,
+    )
+
+    def refresh_perf_panel():
+        if not perf.ENABLED:
+            return
+        perf_text.value = perf.format_summary()
+        perf.dump()
+        page.update()
+
     def save_area_data():
         try:
             res = requests.get(AREA_URL)
@@ -73,38 +90,22 @@ def main(page: ft.Page):
 
         try:
             url = FORECAST_URL_TEMPLATE.format(code=target_office_code)
-            res = requests.get(url)
-            res.raise_for_status()
-            weather_data = res.json()
+            with perf.timed("fetch"):
+                res = requests.get(url)
+                res.raise_for_status()
+            with perf.timed("parse_json"):
+                weather_data = res.json()
 
-            report = weather_data[0]
-            report_datetime = report["reportDatetime"]
-            ts_weather = report["timeSeries"][0]
-            ts_pop = report["timeSeries"][1] if len(report["timeSeries"]) > 1 else None
+            report_datetime, rows = forecast.extract_forecasts(weather_data)
 
-            # データをDBに保存
-            for area_data in ts_weather["areas"]:
-                sub_area_code = area_data["area"]["code"]
-                sub_area_name = area_data["area"]["name"]
-                
-                # エリア名もDBに保存（表示用）
+            # エリア名もDBに保存（表示用）。天気の無いエリアも保存する
+            for sub_area_code, sub_area_name in forecast.extract_areas(weather_data):
                 database.save_area(sub_area_code, sub_area_name)
-                
-                weathers = area_data.get("weathers", [])
-                
-                # 降水確率の取得
-                pops = []
-                if ts_pop:
-                    same_area_pop = next((x for x in ts_pop["areas"] if x["area"]["code"] == sub_area_code), None)
-                    if same_area_pop:
-                        pops = same_area_pop.get("pops", [])
-                
-                time_defines = ts_weather["timeDefines"]
-                
-                for idx, w_text in enumerate(weathers):
-                    target_date = time_defines[idx][:10] # YYYY-MM-DD
-                    pop_val = int(pops[idx]) if len(pops) > idx and pops[idx] else None
-                    # office_code (target_office_code) も一緒に保存
+
+            # データをDBに保存
+            for sub_area_code, sub_area_name, target_date, w_text, pop_val in rows:
+                # office_code (target_office_code) も一緒に保存
+                with perf.timed("save_forecast"):
                     database.save_forecast(target_office_code, sub_area_code, report_datetime, target_date, w_text, pop_val)
 
             # DBからデータを取得して表示
@@ -112,6 +113,7 @@ def main(page: ft.Page):
             
             # 履歴ドロップダウンの更新
             update_history_dropdown(target_office_code)
+            refresh_perf_panel()
 
         except Exception as err:
             weather_display.controls.clear()
@@ -143,7 +145,8 @@ def main(page: ft.Page):
 
         # 日付ごとに情報をまとめる
         for date_str in dates_to_show:
-            results = database.get_forecasts_by_office_and_date(office_code, date_str)
+            with perf.timed("query"):
+                results = database.get_forecasts_by_office_and_date(office_code, date_str)
             if not results:
                 continue
 
@@ -178,7 +181,8 @@ def main(page: ft.Page):
         if not weather_display.controls or len(weather_display.controls) <= 1:
             weather_display.controls.append(ft.Text("データが見つかりませんでした。", color=ft.Colors.GREY))
             
-        page.update()
+        with perf.timed("render"):
+            page.update()
 
     def update_history_dropdown(office_code):
         dates = database.get_historical_dates_by_office(office_code)
@@ -203,6 +207,7 @@ def main(page: ft.Page):
         ft.Divider(),
         history_dropdown,
         ft.Divider(),
+        perf_panel,
     ]
     try:
         area_data = requests.get(AREA_URL).json()
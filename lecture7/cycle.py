@@ -0,0 +1,137 @@
+import datetime
+import os
+import sqlite3
+import time
+
+PORT_URL = "https://www.hellocycling.jp/app/top/port_json?data=data"
+
+# pandas は使う関数の中で読み込む。report.py がパスの定数だけを軽く import できるようにするため
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_DB = os.path.join(BASE_DIR, "bunkyo_cycle.db")
+# 期間ごとの貸出状況DB
+STATUS_DBS = {
+    "default": os.path.join(BASE_DIR, "cycele_status_bunkyo.db"),
+    "morning": os.path.join(BASE_DIR, "cycele_status_bunkyo_morning.db"),
+    "night": os.path.join(BASE_DIR, "cycele_status_bunkyo_night.db"),
+}
+
+STATUS_COLUMNS = ['id', 'address', 'num_bikes_parkable', 'num_bikes_now', 'num_bikes_rentalable', 'num_bikes_limit', 'timestamp']
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def fetch_ports(url=PORT_URL):
+    # hellocyclingの全ポート情報を取得。グラフを描くだけのときは不要なのでここで読み込む
+    import pandas as pd
+    import requests
+
+    response = requests.get(url)
+    response.raise_for_status()
+    data = response.json()
+    return pd.DataFrame.from_dict(data, orient='index')
+
+
+def filter_bunkyo(df):
+    return df[df['address'].str.contains('文京区')].copy()
+
+
+def judge_elevation(x):
+    if x >= 20:
+        return '高い'
+    elif x >= 10:
+        return '普通'
+    else:
+        return '低い'
+
+
+def save_status(df_bunkyo, db_name, now=None):
+    # 取得時刻を付けて cycle_status テーブルに追記する
+    now = now or datetime.datetime.now()
+    df_status = df_bunkyo.copy()
+    df_status['timestamp'] = now.strftime(TIMESTAMP_FORMAT)
+    df_status = df_status[STATUS_COLUMNS]
+
+    conn = sqlite3.connect(db_name)
+    try:
+        df_status.to_sql('cycle_status', conn, if_exists='append', index=False)
+    finally:
+        conn.close()
+    return df_status
+
+
+def collect(db_name, interval_seconds=15 * 60, url=PORT_URL, on_poll=None, max_polls=None, save=save_status):
+    """一定間隔で文京区の貸出状況を取得して保存する
+
+    on_poll には保存した DataFrame が渡される。save を差し替えると保存形式を変えられる。
+    """
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        try:
+            df_bunkyo = filter_bunkyo(fetch_ports(url))
+            df_status = save(df_bunkyo, db_name)
+            if on_poll:
+                on_poll(df_status)
+
+            print("\n現在の貸出状況（文京区）")
+            print(df_status)
+            print(f"\n{interval_seconds / 60}分経過しました。再度データを取得します。")
+        except Exception as e:
+            print(f"エラーが発生しました:{e}")
+
+        polls += 1
+        if max_polls is None or polls < max_polls:
+            time.sleep(interval_seconds)
+
+
+def load_merged(status_db, master_db=MASTER_DB):
+    # ログデータに、マスタデータの情報を付け加える
+    import pandas as pd
+
+    conn1 = sqlite3.connect(status_db)
+    df_log = pd.read_sql("SELECT * FROM cycle_status", conn1)
+    conn1.close()
+
+    conn2 = sqlite3.connect(master_db)
+    df_master = pd.read_sql("SELECT * FROM port_master", conn2)
+    conn2.close()
+
+    df_merged = pd.merge(
+        df_log,
+        df_master[['id', 'name', 'elevation', 'area_type']],
+        on='id',
+        how='left'
+    )
+    df_merged['timestamp'] = pd.to_datetime(df_merged['timestamp'])
+    return df_merged
+
+
+def pivot_by_area(df_merged):
+    return df_merged.groupby(['timestamp', 'area_type'])['num_bikes_rentalable'].mean().reset_index()
+
+
+def plot_by_area(df_pivot, output_path=None, title='文京区：標高エリア別 貸出可能台数の推移'):
+    # グラフ描画のライブラリは重いので、描画するときだけ読み込む
+    import matplotlib.pyplot as plt
+    import japanize_matplotlib  # noqa: F401
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(12, 6))
+
+    # 折れ線グラフを描く（hue='area_type' で色分け）
+    sns.lineplot(data=df_pivot, x='timestamp', y='num_bikes_rentalable', hue='area_type', marker='o')
+
+    plt.title(title, fontsize=16)
+    plt.xlabel('時間', fontsize=12)
+    plt.ylabel('平均貸出可能台数（台）', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.xticks(rotation=45)
+    plt.legend(title='エリアタイプ')
+    plt.tight_layout()
+
+    if output_path:
+        fig.savefig(output_path)
+        plt.close(fig)
+    return fig
+
+
+if __name__ == "__main__":
+    collect(STATUS_DBS["default"])
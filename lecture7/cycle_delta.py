@@ -0,0 +1,287 @@
+# 台数が変わったときだけ行を書く cycle_status の保存形式
+#
+# cycle_status_delta には、ポートごとに台数が前回から変わったポーリングの行だけを入れる。
+# 前回のポーリングにあったポートが消えたときは、台数を全て NULL にした行(削除の印)を入れる。
+# ポーリングした時刻は cycle_poll に全て残すので、任意の期間の時系列を復元できる。
+# address は毎回書かず、同じDBの port_address にポートごとの最新の値だけを持つ。
+#
+#   python cycle_delta.py                                   # 差分形式で収集する
+#   python cycle_delta.py --migrate cycele_status_bunkyo.db  # 既存のDBを差分形式に変換する
+#
+import argparse
+import datetime
+import itertools
+import os
+import sqlite3
+
+import pandas as pd
+
+import cycle
+
+DELTA_DB = os.path.join(cycle.BASE_DIR, "cycle_status_delta.db")
+COUNT_COLUMNS = ['num_bikes_parkable', 'num_bikes_now', 'num_bikes_rentalable', 'num_bikes_limit']
+
+
+def init_delta_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cycle_status_delta (
+            id TEXT,
+            timestamp TEXT,
+            num_bikes_parkable INTEGER,
+            num_bikes_now INTEGER,
+            num_bikes_rentalable INTEGER,
+            num_bikes_limit INTEGER,
+            PRIMARY KEY (id, timestamp)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS cycle_poll (timestamp TEXT PRIMARY KEY)")
+    # ポートごとの最新の台数。ポーリングのたびに履歴全体を集計しないよう別に持つ
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cycle_status_latest (
+            id TEXT PRIMARY KEY,
+            num_bikes_parkable INTEGER,
+            num_bikes_now INTEGER,
+            num_bikes_rentalable INTEGER,
+            num_bikes_limit INTEGER
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS port_address (id TEXT PRIMARY KEY, address TEXT)")
+    # cycle_status_latest が無かった頃のDBは、一度だけ履歴から作る
+    if (conn.execute("SELECT 1 FROM cycle_status_latest LIMIT 1").fetchone() is None
+            and conn.execute("SELECT 1 FROM cycle_status_delta LIMIT 1").fetchone() is not None):
+        conn.execute("""
+            INSERT INTO cycle_status_latest
+            SELECT d.id, d.num_bikes_parkable, d.num_bikes_now, d.num_bikes_rentalable, d.num_bikes_limit
+            FROM cycle_status_delta d
+            JOIN (
+                SELECT id, MAX(timestamp) AS timestamp FROM cycle_status_delta GROUP BY id
+            ) latest ON d.id = latest.id AND d.timestamp = latest.timestamp
+        """)
+
+
+def _latest_counts(conn):
+    # ポートごとの最新の台数。消えたポートは台数が全て None。
+    # API が台数を全て欠損で返したポートも、消えたものと同じ扱いになる
+    rows = conn.execute(f"SELECT id, {', '.join(COUNT_COLUMNS)} FROM cycle_status_latest")
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _diff_poll(latest, timestamp, polled):
+    """1回分のポーリング結果 {id: 台数} と最新の台数を比べ、書く行を返す。latest も更新する"""
+    rows = []
+    for port_id, counts in polled.items():
+        if latest.get(port_id) != counts:
+            latest[port_id] = counts
+            rows.append((port_id, timestamp, *counts))
+    removed = (None,) * len(COUNT_COLUMNS)
+    for port_id, counts in latest.items():
+        if port_id not in polled and counts != removed:
+            latest[port_id] = removed
+            rows.append((port_id, timestamp, *removed))
+    return rows
+
+
+def _write_rows(conn, rows):
+    conn.executemany("INSERT OR REPLACE INTO cycle_status_delta VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT OR REPLACE INTO cycle_status_latest VALUES (?, ?, ?, ?, ?)",
+        [(port_id, *counts) for port_id, _, *counts in rows],
+    )
+
+
+def _status_frame(df_bunkyo, now):
+    df_status = df_bunkyo.copy()
+    df_status['timestamp'] = now.strftime(cycle.TIMESTAMP_FORMAT)
+    return df_status[cycle.STATUS_COLUMNS]
+
+
+def _save_addresses(conn, addresses):
+    """{id: address} のうち、新しいポートと住所が変わったポートだけを port_address に書く"""
+    known = dict(conn.execute("SELECT id, address FROM port_address"))
+    conn.executemany(
+        "INSERT OR REPLACE INTO port_address (id, address) VALUES (?, ?)",
+        [(port_id, address) for port_id, address in addresses.items() if known.get(port_id, object()) != address],
+    )
+
+
+def _count(value):
+    # API が台数を欠損で返すことがあるので、NULL として保存する
+    return None if pd.isna(value) else int(value)
+
+
+def write_delta(df_status, db_name, now):
+    """時刻 now のポーリング結果のうち、前回から変わった行と消えたポートの印を書く。書いた行数を返す"""
+    timestamp = now.strftime(cycle.TIMESTAMP_FORMAT)
+    polled = {
+        port_id: tuple(_count(c) for c in counts)
+        for port_id, *counts in df_status[['id'] + COUNT_COLUMNS].itertuples(index=False, name=None)
+    }
+    conn = sqlite3.connect(db_name)
+    try:
+        init_delta_db(conn)
+        rows = _diff_poll(_latest_counts(conn), timestamp, polled)
+        _write_rows(conn, rows)
+        _save_addresses(conn, dict(df_status[['id', 'address']].itertuples(index=False, name=None)))
+        conn.execute("INSERT OR IGNORE INTO cycle_poll (timestamp) VALUES (?)", (timestamp,))
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def save_status_delta(df_bunkyo, db_name, now=None):
+    """cycle.save_status の差分版。前回から台数が変わったポートだけを書く
+
+    戻り値は save_status と同じく、今回のポーリング結果の全行。
+    """
+    now = now or datetime.datetime.now()
+    df_status = _status_frame(df_bunkyo, now)
+    write_delta(df_status, db_name, now)
+    return df_status
+
+
+def read_latest(db_name):
+    """ポートごとの最新の台数。最新のポーリングで消えていたポートと、台数が欠けているポートは除く"""
+    conn = sqlite3.connect(db_name)
+    try:
+        # cycle_status_latest が無い古いDBでも、ここで一度作れば以降は小さい表を読むだけで済む
+        init_delta_db(conn)
+        conn.commit()
+        return pd.read_sql(f"""
+            SELECT id, {', '.join(COUNT_COLUMNS)}
+            FROM cycle_status_latest
+            WHERE {' AND '.join(f'{col} IS NOT NULL' for col in COUNT_COLUMNS)}
+        """, conn)
+    finally:
+        conn.close()
+
+
+def read_changes(db_name, start, end, ids=None):
+    """期間 [start, end) の台数の変化点を返す
+
+    各ポートの最初の行は start 時点の値（start 以前の最後の変化）で、timestamp は start にそろえる。
+    台数が全て欠損の行は、そのポーリングでポートが消えたことを表す。
+    """
+    start = pd.Timestamp(start).strftime(cycle.TIMESTAMP_FORMAT)
+    end = pd.Timestamp(end).strftime(cycle.TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(db_name)
+    try:
+        # start 時点の値
+        df_initial = pd.read_sql(f"""
+            SELECT d.id, ? AS timestamp, d.num_bikes_parkable, d.num_bikes_now, d.num_bikes_rentalable, d.num_bikes_limit
+            FROM cycle_status_delta d
+            WHERE d.timestamp = (
+                SELECT MAX(timestamp) FROM cycle_status_delta WHERE id = d.id AND timestamp <= ?
+            ) AND NOT ({' AND '.join(f'd.{col} IS NULL' for col in COUNT_COLUMNS)})
+        """, conn, params=(start, start))
+        df_changes = pd.read_sql("""
+            SELECT id, timestamp, num_bikes_parkable, num_bikes_now, num_bikes_rentalable, num_bikes_limit
+            FROM cycle_status_delta
+            WHERE timestamp > ? AND timestamp < ?
+        """, conn, params=(start, end))
+    finally:
+        conn.close()
+
+    df = pd.concat([df_initial, df_changes], ignore_index=True)
+    if ids is not None:
+        df = df[df['id'].isin(list(ids))]
+    df['timestamp'] = pd.to_datetime(df['timestamp']).astype('datetime64[ns]')
+    df[COUNT_COLUMNS] = df[COUNT_COLUMNS].astype('Int64')
+    return df.sort_values(['id', 'timestamp'], ignore_index=True)
+
+
+def read_series(db_name, start, end, ids=None):
+    """期間 [start, end) の全ポーリング時刻について、cycle_status と同じ形の時系列を復元する
+
+    address は port_address にある最新の値になる。
+    """
+    df_changes = read_changes(db_name, start, end, ids)
+
+    conn = sqlite3.connect(db_name)
+    try:
+        df_polls = pd.read_sql(
+            "SELECT timestamp FROM cycle_poll WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            conn,
+            params=(pd.Timestamp(start).strftime(cycle.TIMESTAMP_FORMAT), pd.Timestamp(end).strftime(cycle.TIMESTAMP_FORMAT)),
+        )
+        addresses = dict(conn.execute("SELECT id, address FROM port_address"))
+    finally:
+        conn.close()
+    df_polls['timestamp'] = pd.to_datetime(df_polls['timestamp']).astype('datetime64[ns]')
+
+    # ポーリング時刻 × ポートの格子に、その時点で有効な値を当てはめる。
+    # 消えていたポートは削除の印が当たって欠損になるので落とす
+    df_grid = df_polls.merge(df_changes[['id']].drop_duplicates(), how='cross')
+    df = pd.merge_asof(
+        df_grid.sort_values('timestamp'),
+        df_changes.sort_values('timestamp'),
+        on='timestamp',
+        by='id',
+    ).dropna(subset=COUNT_COLUMNS, how='all')
+    for col in COUNT_COLUMNS:
+        # 台数が一部だけ欠けていた行があるときは、欠損を残せる型のままにする
+        df[col] = df[col].astype('int64' if df[col].notna().all() else 'Int64')
+    df['address'] = df['id'].map(addresses)
+
+    df['timestamp'] = df['timestamp'].dt.strftime(cycle.TIMESTAMP_FORMAT)
+    return df[cycle.STATUS_COLUMNS].sort_values(['timestamp', 'id'], ignore_index=True)
+
+
+def migrate(full_db, delta_db):
+    """全行形式の cycle_status を差分形式に変換する。書いた行数と元の行数を返す"""
+    src = sqlite3.connect(full_db)
+    dst = sqlite3.connect(delta_db)
+    try:
+        init_delta_db(dst)
+        latest = _latest_counts(dst)
+        written = 0
+        total = 0
+        addresses = {}
+        rows = src.execute(f"""
+            SELECT timestamp, id, address, {', '.join(COUNT_COLUMNS)}
+            FROM cycle_status
+            ORDER BY timestamp
+        """)
+        # ポーリング1回分ずつ比べるので、その回に無かったポートも分かる
+        for timestamp, poll_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            poll_rows = list(poll_rows)
+            total += len(poll_rows)
+            polled = {}
+            for _, port_id, address, *counts in poll_rows:
+                polled[port_id] = tuple(counts)
+                addresses[port_id] = address
+            delta_rows = _diff_poll(latest, timestamp, polled)
+            _write_rows(dst, delta_rows)
+            written += len(delta_rows)
+            dst.execute("INSERT OR IGNORE INTO cycle_poll (timestamp) VALUES (?)", (timestamp,))
+        _save_addresses(dst, addresses)
+        dst.commit()
+    finally:
+        src.close()
+        dst.close()
+    return written, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="台数が変わったときだけ保存する形式で cycle_status を扱う")
+    parser.add_argument("--db", default=DELTA_DB, help="差分形式のDB")
+    parser.add_argument("--migrate", help="このDBの cycle_status を --db に変換する")
+    args = parser.parse_args()
+
+    if args.migrate:
+        written, total = migrate(args.migrate, args.db)
+        print(f"{total} 行のうち {written} 行を書き込みました")
+        print(f"サイズ: {os.path.getsize(args.migrate):,} -> {os.path.getsize(args.db):,} bytes")
+    else:
+        def save(df_bunkyo, db_name):
+            now = datetime.datetime.now()
+            df_status = _status_frame(df_bunkyo, now)
+            written = write_delta(df_status, db_name, now)
+            print(f"{written}/{len(df_status)} 行の変化を保存しました")
+            return df_status
+
+        cycle.collect(args.db, save=save)
+
+
+if __name__ == "__main__":
+    main()
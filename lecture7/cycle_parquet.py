@@ -0,0 +1,217 @@
+# SQLite のテーブルを型付きの Parquet に書き出し、分析時はメモリマップで必要な列・期間だけ読む
+#
+#   python cycle_parquet.py            # parquet/ 以下に全テーブルを書き出す
+#
+import datetime
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import cycle
+
+PARQUET_DIR = os.path.join(cycle.BASE_DIR, "parquet")
+WEATHER_DB = os.path.join(os.path.dirname(cycle.BASE_DIR), "lecture6", "weather-forecast", "src", "weather.db")
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+CYCLE_STATUS_SCHEMA = pa.schema([
+    ("id", CATEGORY),
+    ("num_bikes_parkable", pa.int16()),
+    ("num_bikes_now", pa.int16()),
+    ("num_bikes_rentalable", pa.int16()),
+    ("num_bikes_limit", pa.int16()),
+    ("timestamp", pa.timestamp("s")),
+    ("date", pa.string()),
+])
+
+PORT_MASTER_SCHEMA = pa.schema([
+    ("id", CATEGORY),
+    ("name", pa.string()),
+    ("address", pa.string()),
+    ("lat", pa.float64()),
+    ("lng", pa.float64()),
+    ("elevation", pa.float32()),
+    ("area_type", CATEGORY),
+])
+
+FORECASTS_SCHEMA = pa.schema([
+    ("office_code", CATEGORY),
+    ("area_code", CATEGORY),
+    ("report_datetime", pa.timestamp("s", tz="Asia/Tokyo")),
+    ("target_date", pa.date32()),
+    ("weather", pa.string()),
+    ("pop", pa.int16()),
+    ("fetch_timestamp", pa.timestamp("us")),
+])
+
+CHUNK_SIZE = 200_000
+
+
+def _reset_dir(path):
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+
+def _write_chunks(chunks, schema, out_dir, partition_cols):
+    # チャンクごとに書き出すので、テーブル全体をメモリに載せない
+    _reset_dir(out_dir)
+    for i, df in enumerate(chunks):
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        ds.write_dataset(
+            table,
+            out_dir,
+            format="parquet",
+            partitioning=partition_cols,
+            partitioning_flavor="hive",
+            basename_template=f"part-{i:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+
+def export_cycle_status(status_db, out_dir):
+    """cycle_status を日付ごとのパーティションに書き出す。address は port_master にあるので落とす"""
+    def chunks():
+        conn = sqlite3.connect(status_db)
+        try:
+            sql = """
+                SELECT id, num_bikes_parkable, num_bikes_now, num_bikes_rentalable, num_bikes_limit, timestamp
+                FROM cycle_status
+            """
+            for df in pd.read_sql(sql, conn, chunksize=CHUNK_SIZE):
+                df['id'] = df['id'].astype('category')
+                for col in ['num_bikes_parkable', 'num_bikes_now', 'num_bikes_rentalable', 'num_bikes_limit']:
+                    df[col] = df[col].astype('int16')
+                df['date'] = df['timestamp'].str[:10]
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                yield df
+        finally:
+            conn.close()
+
+    _write_chunks(chunks(), CYCLE_STATUS_SCHEMA, out_dir, ["date"])
+
+
+def export_port_master(master_db, out_path):
+    conn = sqlite3.connect(master_db)
+    try:
+        df = pd.read_sql("SELECT id, name, address, lat, lng, elevation, area_type FROM port_master", conn)
+    finally:
+        conn.close()
+    df['id'] = df['id'].astype('category')
+    df['area_type'] = df['area_type'].astype('category')
+    table = pa.Table.from_pandas(df, schema=PORT_MASTER_SCHEMA, preserve_index=False)
+    pq.write_table(table, out_path)
+
+
+def export_forecasts(weather_db, out_dir):
+    """lecture6 の forecasts を支庁ごとのパーティションに書き出す"""
+    def chunks():
+        conn = sqlite3.connect(weather_db)
+        try:
+            sql = """
+                SELECT office_code, area_code, report_datetime, target_date, weather, pop, fetch_timestamp
+                FROM forecasts
+            """
+            for df in pd.read_sql(sql, conn, chunksize=CHUNK_SIZE):
+                df['office_code'] = df['office_code'].astype('category')
+                df['area_code'] = df['area_code'].astype('category')
+                df['report_datetime'] = pd.to_datetime(df['report_datetime'], format='ISO8601').dt.tz_convert('Asia/Tokyo')
+                df['target_date'] = pd.to_datetime(df['target_date']).dt.date
+                df['pop'] = df['pop'].astype('Int16')
+                df['fetch_timestamp'] = pd.to_datetime(df['fetch_timestamp'], format='ISO8601')
+                yield df
+        finally:
+            conn.close()
+
+    _write_chunks(chunks(), FORECASTS_SCHEMA, out_dir, ["office_code"])
+
+
+def export_all(parquet_dir=PARQUET_DIR):
+    for period, status_db in cycle.STATUS_DBS.items():
+        if os.path.exists(status_db):
+            export_cycle_status(status_db, os.path.join(parquet_dir, "cycle_status", period))
+    export_port_master(cycle.MASTER_DB, os.path.join(parquet_dir, "port_master.parquet"))
+    if os.path.exists(WEATHER_DB):
+        export_forecasts(WEATHER_DB, os.path.join(parquet_dir, "forecasts"))
+
+
+def _time_filters(start, end):
+    # 日付パーティションで絞ってから、行グループの統計で timestamp を絞る
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start).to_pydatetime()
+        filters += [("date", ">=", start.strftime("%Y-%m-%d")), ("timestamp", ">=", start)]
+    if end is not None:
+        end = pd.Timestamp(end).to_pydatetime()
+        filters += [("date", "<=", end.strftime("%Y-%m-%d")), ("timestamp", "<", end)]
+    return filters or None
+
+
+def read_cycle_status(period="default", columns=None, start=None, end=None, ids=None, parquet_dir=PARQUET_DIR):
+    """cycle_status をメモリマップで読む。columns / 期間 / ポートIDは読み込み時に絞り込む"""
+    filters = _time_filters(start, end) or []
+    if ids is not None:
+        filters.append(("id", "in", list(ids)))
+    table = pq.read_table(
+        os.path.join(parquet_dir, "cycle_status", period),
+        columns=columns,
+        filters=filters or None,
+        memory_map=True,
+        partitioning=ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive"),
+    )
+    return table.to_pandas()
+
+
+def read_port_master(columns=None, parquet_dir=PARQUET_DIR):
+    return pq.read_table(
+        os.path.join(parquet_dir, "port_master.parquet"), columns=columns, memory_map=True
+    ).to_pandas()
+
+
+def read_forecasts(office_code=None, columns=None, start_date=None, end_date=None, parquet_dir=PARQUET_DIR):
+    filters = []
+    if office_code is not None:
+        filters.append(("office_code", "=", office_code))
+    if start_date is not None:
+        filters.append(("target_date", ">=", pd.Timestamp(start_date).date()))
+    if end_date is not None:
+        filters.append(("target_date", "<=", pd.Timestamp(end_date).date()))
+    table = pq.read_table(
+        os.path.join(parquet_dir, "forecasts"),
+        columns=columns,
+        filters=filters or None,
+        memory_map=True,
+        partitioning=ds.partitioning(pa.schema([("office_code", pa.string())]), flavor="hive"),
+    )
+    return table.to_pandas(date_as_object=False)
+
+
+def load_merged(period="default", start=None, end=None, parquet_dir=PARQUET_DIR):
+    """cycle.load_merged の Parquet 版。グラフに使う列だけを読む"""
+    df_log = read_cycle_status(
+        period, columns=['id', 'num_bikes_rentalable', 'timestamp'], start=start, end=end, parquet_dir=parquet_dir
+    )
+    df_master = read_port_master(columns=['id', 'name', 'elevation', 'area_type'], parquet_dir=parquet_dir)
+
+    # id はカテゴリなので、カテゴリごとにマスタを引いてからコードで展開する
+    master = df_master.assign(id=df_master['id'].astype(str)).drop_duplicates('id').set_index('id')
+    categories = df_log['id'].cat.categories.astype(str)
+    codes = df_log['id'].cat.codes.to_numpy()
+    # id が欠損の行はコードが -1 になり、そのまま引くと最後のカテゴリの値になってしまう
+    missing = codes < 0
+    for col in ['name', 'elevation', 'area_type']:
+        lookup = master[col].reindex(categories).to_numpy()
+        df_log[col] = pd.Series(lookup[codes], index=df_log.index).mask(missing)
+    df_log['area_type'] = df_log['area_type'].astype('category')
+    return df_log
+
+
+if __name__ == "__main__":
+    start = datetime.datetime.now()
+    export_all()
+    print(f"Parquet に書き出しました: {PARQUET_DIR} ({datetime.datetime.now() - start})")
@@ -0,0 +1,206 @@
+# ポーリングのたびにポートごとの統計を更新し、空・満車になったポートをイベントとして流す
+#
+#   python cycle_stream.py --events events.jsonl          # 収集しながら監視する
+#   python cycle_stream.py --replay cycele_status_bunkyo_night.db   # 保存済みのログを流し直す
+#
+import argparse
+import datetime
+import json
+import math
+import sqlite3
+from collections import deque
+
+import cycle
+
+WINDOW_SIZE = 8  # 15分おきなら直近2時間
+EMPTY_SOON_MINUTES = 30
+
+
+class RollingStats:
+    """直近 window_size 件の台数について、平均・標準偏差・傾きを O(1) で更新する"""
+
+    def __init__(self, window_size=WINDOW_SIZE):
+        self.window = deque(maxlen=window_size)
+        self.sum_t = 0.0
+        self.sum_y = 0.0
+        self.sum_tt = 0.0
+        self.sum_ty = 0.0
+        self.sum_yy = 0.0
+
+    def _add(self, t, y, sign):
+        self.sum_t += sign * t
+        self.sum_y += sign * y
+        self.sum_tt += sign * t * t
+        self.sum_ty += sign * t * y
+        self.sum_yy += sign * y * y
+
+    def push(self, t, y):
+        # 窓からあふれる値を合計から引いてから追加する
+        if len(self.window) == self.window.maxlen:
+            self._add(*self.window[0], -1)
+        self.window.append((t, y))
+        self._add(t, y, 1)
+
+    @property
+    def count(self):
+        return len(self.window)
+
+    @property
+    def mean(self):
+        return self.sum_y / self.count if self.count else None
+
+    @property
+    def std(self):
+        if not self.count:
+            return None
+        variance = self.sum_yy / self.count - self.mean ** 2
+        return math.sqrt(max(0.0, variance))
+
+    @property
+    def slope(self):
+        # 最小二乗法の傾き（台/分）
+        n = self.count
+        denominator = n * self.sum_tt - self.sum_t ** 2
+        if n < 2 or denominator <= 1e-9:
+            return None
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+
+class StationState:
+    def __init__(self, window_size):
+        self.rentalable = RollingStats(window_size)
+        self.empty = False
+        self.full = False
+        self.empty_soon = False
+        self.empty_since = None
+
+
+class StationMonitor:
+    """ポートごとの状態を持ち、空・満車・空になりそうなポートを on_event に渡す
+
+    イベントは dict で、type は empty / empty_recovered / full / full_recovered / empty_soon のどれか。
+    on_event には queue.Queue().put や JsonlWriter などを渡す。
+    """
+
+    def __init__(self, on_event, window_size=WINDOW_SIZE, empty_soon_minutes=EMPTY_SOON_MINUTES):
+        self.on_event = on_event
+        self.window_size = window_size
+        self.empty_soon_minutes = empty_soon_minutes
+        self.stations = {}
+        self.epoch = None
+
+    def _emit(self, event_type, station_id, timestamp, **extra):
+        event = {"type": event_type, "id": station_id, "timestamp": timestamp.strftime(cycle.TIMESTAMP_FORMAT)}
+        event.update(extra)
+        self.on_event(event)
+
+    def update(self, station_id, timestamp, rentalable, parkable):
+        state = self.stations.get(station_id)
+        if state is None:
+            state = self.stations[station_id] = StationState(self.window_size)
+        if self.epoch is None:
+            self.epoch = timestamp
+
+        # 数値誤差を抑えるため、最初の観測からの経過分で持つ
+        minutes = (timestamp - self.epoch).total_seconds() / 60
+        stats = state.rentalable
+        stats.push(minutes, rentalable)
+
+        is_empty = rentalable == 0
+        if is_empty and not state.empty:
+            state.empty_since = timestamp
+            self._emit("empty", station_id, timestamp)
+        elif not is_empty and state.empty:
+            duration = (timestamp - state.empty_since).total_seconds() / 60
+            self._emit("empty_recovered", station_id, timestamp, empty_minutes=duration)
+        state.empty = is_empty
+
+        is_full = parkable == 0
+        if is_full and not state.full:
+            self._emit("full", station_id, timestamp)
+        elif not is_full and state.full:
+            self._emit("full_recovered", station_id, timestamp)
+        state.full = is_full
+
+        # 減り続けているポートは、今の傾きのまま何分で空になるかを見積もる
+        slope = stats.slope
+        minutes_to_empty = rentalable / -slope if slope is not None and slope < 0 and not is_empty else None
+        empty_soon = minutes_to_empty is not None and minutes_to_empty <= self.empty_soon_minutes
+        if empty_soon and not state.empty_soon:
+            self._emit(
+                "empty_soon", station_id, timestamp,
+                minutes_to_empty=round(minutes_to_empty, 1), slope_per_hour=round(slope * 60, 2),
+            )
+        state.empty_soon = empty_soon
+
+    def update_frame(self, df_status):
+        """cycle.collect の on_poll にそのまま渡せる形で、1回分のポーリング結果を取り込む"""
+        for row in df_status[['id', 'timestamp', 'num_bikes_rentalable', 'num_bikes_parkable']].itertuples(index=False):
+            timestamp = datetime.datetime.strptime(row.timestamp, cycle.TIMESTAMP_FORMAT)
+            self.update(row.id, timestamp, int(row.num_bikes_rentalable), int(row.num_bikes_parkable))
+
+    def snapshot(self):
+        # 現在のポートごとの統計
+        return {
+            station_id: {
+                "mean": state.rentalable.mean,
+                "std": state.rentalable.std,
+                "slope_per_hour": state.rentalable.slope * 60 if state.rentalable.slope is not None else None,
+                "empty": state.empty,
+                "full": state.full,
+            }
+            for station_id, state in self.stations.items()
+        }
+
+
+class JsonlWriter:
+    """イベントを1行1JSONでファイルに追記する"""
+
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def replay(status_db, monitor):
+    # 保存済みの cycle_status を時刻順に流す
+    conn = sqlite3.connect(status_db)
+    try:
+        rows = conn.execute("""
+            SELECT id, timestamp, num_bikes_rentalable, num_bikes_parkable
+            FROM cycle_status
+            ORDER BY timestamp
+        """)
+        for station_id, timestamp, rentalable, parkable in rows:
+            monitor.update(station_id, datetime.datetime.strptime(timestamp, cycle.TIMESTAMP_FORMAT), rentalable, parkable)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文京区のポートが空・満車になったらイベントを出す")
+    parser.add_argument("--db", default=cycle.STATUS_DBS["default"], help="収集したデータの保存先")
+    parser.add_argument("--events", help="イベントを書き出す JSONL ファイル。省略時は画面に表示")
+    parser.add_argument("--replay", help="収集せずに、このDBの cycle_status を流し直す")
+    parser.add_argument("--window", type=int, default=WINDOW_SIZE)
+    args = parser.parse_args()
+
+    sink = JsonlWriter(args.events) if args.events else (lambda event: print(json.dumps(event, ensure_ascii=False)))
+    monitor = StationMonitor(sink, window_size=args.window)
+    try:
+        if args.replay:
+            replay(args.replay, monitor)
+        else:
+            cycle.collect(args.db, on_poll=monitor.update_frame)
+    finally:
+        if args.events:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
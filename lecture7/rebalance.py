@@ -0,0 +1,181 @@
+# 最新の貸出状況から、トラックで自転車を運ぶ再配置の計画を作る
+#
+#   python rebalance.py                                  # 既定のDBの最新時点で計画する
+#   python rebalance.py --db cycele_status_bunkyo_night.db
+#
+import argparse
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import cycle
+import cycle_delta
+
+EARTH_RADIUS_KM = 6371.0
+DISTANCE_CACHE = os.path.join(cycle.BASE_DIR, "distance_cache.npz")
+BLOCK_SIZE = 1024
+CHUNK_PAIRS = 65536
+
+# 標高の高いポートほど自転車が減りやすいので、多めに置いておく
+TARGET_RATIO = {'高い': 0.6, '普通': 0.5, '低い': 0.4}
+
+
+def haversine_matrix(lat, lng):
+    """全ポート間の距離(km)を float32 の行列で返す。メモリを抑えるため行ごとのブロックで計算する"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    n = len(lat)
+    distances = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        dlat = lat[start:stop, None] - lat[None, :]
+        dlng = lng[start:stop, None] - lng[None, :]
+        a = np.sin(dlat / 2) ** 2 + cos_lat[start:stop, None] * cos_lat[None, :] * np.sin(dlng / 2) ** 2
+        distances[start:stop] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return distances
+
+
+def _ports_key(df_ports):
+    # ポートの並びと座標が同じなら同じキーになる
+    h = hashlib.sha256()
+    h.update("\n".join(df_ports['id'].astype(str)).encode("utf-8"))
+    h.update(df_ports[['lat', 'lng']].to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class DistanceCache:
+    """port_master の距離行列を保持する。ポートが変わったときだけ計算し直す"""
+
+    def __init__(self, path=DISTANCE_CACHE):
+        self.path = path
+        self.key = None
+        self.distances = None
+
+    def get(self, df_ports):
+        key = _ports_key(df_ports)
+        if key == self.key:
+            return self.distances
+
+        if self.path and os.path.exists(self.path):
+            with np.load(self.path) as cached:
+                if str(cached['key']) == key:
+                    self.key, self.distances = key, cached['distances']
+                    return self.distances
+
+        self.key = key
+        self.distances = haversine_matrix(df_ports['lat'], df_ports['lng'])
+        if self.path:
+            np.savez(self.path, key=np.array(key), distances=self.distances)
+        return self.distances
+
+
+def load_ports(master_db=cycle.MASTER_DB):
+    conn = sqlite3.connect(master_db)
+    try:
+        df = pd.read_sql("""
+            SELECT id, name, lat, lng, elevation, area_type
+            FROM port_master
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+            ORDER BY id
+        """, conn)
+    finally:
+        conn.close()
+    return df.drop_duplicates('id').reset_index(drop=True)
+
+
+def latest_snapshot(status_db):
+    """最新ポーリング時点のポートごとの台数。全行形式と差分形式(cycle_delta)のどちらのDBでも読める"""
+    conn = sqlite3.connect(status_db)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "cycle_status_delta" not in tables:
+            return pd.read_sql("""
+                SELECT id, num_bikes_now, num_bikes_rentalable, num_bikes_parkable, num_bikes_limit
+                FROM cycle_status
+                WHERE timestamp = (SELECT MAX(timestamp) FROM cycle_status)
+            """, conn)
+    finally:
+        conn.close()
+    return cycle_delta.read_latest(status_db)
+
+
+def plan_moves(df_ports, df_snapshot, distances, target_ratio=TARGET_RATIO, truck_capacity=None):
+    """余っているポートから足りないポートへ、近い組から順に自転車を割り当てる
+
+    df_ports と distances の行は同じ順番であること。戻り値は移動の一覧で、
+    truck_capacity を指定すると各移動に必要な往復回数 trips も付ける。
+    """
+    df = df_ports[['id', 'name', 'area_type']].merge(df_snapshot, on='id', how='inner')
+    index = pd.Index(df_ports['id']).get_indexer(df['id'])
+
+    ratio = df['area_type'].map(target_ratio).fillna(0.5).to_numpy()
+    limit = df['num_bikes_limit'].to_numpy()
+    target = np.round(limit * ratio).astype(np.int64)
+    rentalable = df['num_bikes_rentalable'].to_numpy()
+
+    # 持ち出せるのは貸出可能な自転車だけ、置けるのは空いているラックだけ
+    surplus = np.minimum(rentalable - target, rentalable).clip(min=0)
+    deficit = np.minimum(target - rentalable, df['num_bikes_parkable'].to_numpy()).clip(min=0)
+
+    donors = np.flatnonzero(surplus)
+    receivers = np.flatnonzero(deficit)
+    columns = ['from_id', 'from_name', 'to_id', 'to_name', 'bikes', 'distance_km']
+    if len(donors) == 0 or len(receivers) == 0:
+        return pd.DataFrame(columns=columns + (['trips'] if truck_capacity else []))
+
+    sub = distances[np.ix_(index[donors], index[receivers])]
+    order = np.argsort(sub, axis=None, kind='stable')
+    surplus = surplus.copy()
+    deficit = deficit.copy()
+    remaining = min(surplus.sum(), deficit.sum())
+
+    moves = []
+    ids = df['id'].to_numpy()
+    names = df['name'].to_numpy()
+    n_receivers = len(receivers)
+    for chunk_start in range(0, len(order), CHUNK_PAIRS):
+        if remaining <= 0:
+            break
+        # 使い切ったポートの組は二度と使わないので、チャンクごとにまとめて除く
+        chunk = order[chunk_start:chunk_start + CHUNK_PAIRS]
+        d_idx, r_idx = np.divmod(chunk, n_receivers)
+        alive = (surplus[donors[d_idx]] > 0) & (deficit[receivers[r_idx]] > 0)
+        for d, r in zip(d_idx[alive].tolist(), r_idx[alive].tolist()):
+            i, j = donors[d], receivers[r]
+            bikes = min(surplus[i], deficit[j])
+            if bikes <= 0:
+                continue
+            surplus[i] -= bikes
+            deficit[j] -= bikes
+            remaining -= bikes
+            moves.append((ids[i], names[i], ids[j], names[j], int(bikes), float(sub[d, r])))
+            if remaining <= 0:
+                break
+
+    df_moves = pd.DataFrame(moves, columns=columns)
+    if truck_capacity:
+        df_moves['trips'] = -(-df_moves['bikes'] // truck_capacity)
+    return df_moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="最新の貸出状況から自転車の再配置計画を作る")
+    parser.add_argument("--db", default=cycle.STATUS_DBS["default"])
+    parser.add_argument("--master", default=cycle.MASTER_DB)
+    parser.add_argument("--truck-capacity", type=int, default=None, help="1回で運べる台数")
+    args = parser.parse_args()
+
+    df_ports = load_ports(args.master)
+    distances = DistanceCache().get(df_ports)
+    df_moves = plan_moves(df_ports, latest_snapshot(args.db), distances, truck_capacity=args.truck_capacity)
+
+    print(df_moves.to_string(index=False))
+    print(f"\n合計 {df_moves['bikes'].sum()} 台 / 総移動距離 {(df_moves['bikes'] * df_moves['distance_km']).sum():.2f} 台・km")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# ノートブックを実行せずに、期間ごとの貸出可能台数のグラフを PNG で出力する
+#
+#   python report.py                    # default / morning / night の3枚を charts/ に出力
+#   python report.py night --force      # 入力が変わっていなくても描き直す
+#
+# 重いライブラリ(pandas / matplotlib / seaborn)は描画するワーカープロセスの中でだけ読み込む。
+# 入力DBのファイルが前回から変わっていなければ、中身を読まずに描き直さない。
+# ファイルが変わっていたら、グラフに使う列の中身のハッシュを比べて決める。
+import time
+
+START = time.perf_counter()
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# cycle は pandas を関数の中でしか読み込まないので、ここで import しても軽い
+from cycle import BASE_DIR, MASTER_DB, STATUS_DBS
+
+TITLES = {
+    "default": "文京区：標高エリア別 貸出可能台数の推移",
+    "morning": "文京区：標高エリア別 貸出可能台数の推移（朝）",
+    "night": "文京区：標高エリア別 貸出可能台数の推移（夜）",
+}
+OUTPUT_DIR = os.path.join(BASE_DIR, "charts")
+MANIFEST_NAME = "report_manifest.json"
+# グラフの描き方を変えたら上げる。前回の出力を使わずに描き直す
+RENDER_VERSION = 1
+HASH_BATCH_ROWS = 10000
+
+
+def data_hash(status_db, master_db):
+    """グラフに使う列の中身全てからハッシュを作る。行は少しずつ読む"""
+    h = hashlib.sha256(f"v{RENDER_VERSION}".encode())
+    for db_name, sql in [
+        (status_db, "SELECT id, num_bikes_rentalable, timestamp FROM cycle_status ORDER BY rowid"),
+        (master_db, "SELECT id, area_type FROM port_master ORDER BY rowid"),
+    ]:
+        # 読み取り専用で開く。無いファイルを空のDBとして作らない
+        conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(sql)
+            while True:
+                rows = cursor.fetchmany(HASH_BATCH_ROWS)
+                if not rows:
+                    break
+                h.update(repr(rows).encode("utf-8"))
+        finally:
+            conn.close()
+    return h.hexdigest()
+
+
+def file_signature(*db_names):
+    """DBファイル(と WAL)のサイズと更新時刻。中身を読まずに変更の有無を見るのに使う"""
+    signature = []
+    for db_name in db_names:
+        for path in (db_name, db_name + "-wal"):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                signature.append([path, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def render_chart(period, status_db, master_db, output_path, previous_hash=None):
+    """ワーカープロセスで実行される。ハッシュが previous_hash と同じなら描かない
+
+    (期間, ハッシュ, 描画にかかった秒数) を返す。描かなかったときの秒数は None。
+    """
+    started = time.perf_counter()
+    digest = data_hash(status_db, master_db)
+    if digest == previous_hash:
+        return period, digest, None
+
+    # ここで初めて重いライブラリを読み込む
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import cycle
+
+    df_pivot = cycle.pivot_by_area(cycle.load_merged(status_db, master_db))
+    cycle.plot_by_area(df_pivot, output_path, title=TITLES.get(period, TITLES["default"]))
+    return period, digest, time.perf_counter() - started
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="期間ごとの貸出可能台数のグラフを PNG で出力する")
+    parser.add_argument("periods", nargs="*", help=f"出力する期間 ({' / '.join(STATUS_DBS)})。省略時は全て")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR)
+    parser.add_argument("--force", action="store_true", help="入力が変わっていなくても描き直す")
+    parser.add_argument("--workers", type=int, default=None, help="ハッシュと描画をするプロセス数（既定はグラフの数とCPU数の小さい方）")
+    args = parser.parse_args()
+    unknown = [p for p in args.periods if p not in STATUS_DBS]
+    if unknown:
+        parser.error(f"不明な期間です: {', '.join(unknown)}")
+    periods = args.periods or list(STATUS_DBS)
+    if not os.path.exists(MASTER_DB):
+        parser.error(f"ポートのマスタDBがありません: {MASTER_DB}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest_path = os.path.join(args.out_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    jobs = []
+    signatures = {}
+    missing = []
+    for period in periods:
+        if not os.path.exists(STATUS_DBS[period]):
+            print(f"{period}: DBがないので飛ばします ({STATUS_DBS[period]})", file=sys.stderr)
+            missing.append(period)
+            continue
+        output_path = os.path.join(args.out_dir, f"cycle_{period}.png")
+        # 読み始める前の状態を記録する。ハッシュ中に書き込まれても、次回はもう一度読む
+        signatures[period] = file_signature(STATUS_DBS[period], MASTER_DB)
+        previous = manifest.get(period)
+        if not isinstance(previous, dict) or args.force or not os.path.exists(output_path):
+            previous = {}
+        if previous and previous.get("files") == signatures[period]:
+            print(f"{period}: 変更なし ({output_path})")
+            continue
+        jobs.append((period, STATUS_DBS[period], MASTER_DB, output_path, previous.get("hash")))
+
+    if jobs:
+        # 子プロセスでも必ず画面を使わない Agg で描く
+        os.environ["MPLBACKEND"] = "Agg"
+        workers = args.workers or min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_chart, *job) for job in jobs]
+            for future in futures:
+                period, digest, elapsed = future.result()
+                manifest[period] = {"hash": digest, "files": signatures[period]}
+                output_path = os.path.join(args.out_dir, f"cycle_{period}.png")
+                if elapsed is None:
+                    print(f"{period}: 変更なし ({output_path})")
+                else:
+                    print(f"{period}: {elapsed:.2f} 秒で描画しました ({output_path})")
+
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"合計 {time.perf_counter() - START:.2f} 秒")
+    if missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# 貸出状況の各観測に、その時点で発表されていた東京地方の天気予報を結び付ける
+#
+# 予報は小さいので全てメモリに載せ、cycle_status は時刻順にチャンクで読みながら
+# merge_asof で「観測日が対象日で、観測時刻までに発表された最新の予報」を付ける。
+#
+#   python weather_join.py                       # 既定のDBで雨の有無・標高別の平均台数を出す
+#   python weather_join.py --out joined.db       # 結合結果を SQLite に書き出す
+#
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+import cycle
+
+WEATHER_DB = os.path.join(os.path.dirname(cycle.BASE_DIR), "lecture6", "weather-forecast", "src", "weather.db")
+TOKYO_OFFICE = "130000"
+TOKYO_AREA = "130010"  # 東京地方
+CHUNK_SIZE = 100_000
+RAIN_POP = 50
+
+
+def load_forecast_features(weather_db=WEATHER_DB, office_code=TOKYO_OFFICE, area_code=TOKYO_AREA):
+    """予報を読み、雨・雪フラグを前もって計算しておく。発表時刻の順に並べて返す"""
+    conn = sqlite3.connect(weather_db)
+    try:
+        df = pd.read_sql("""
+            SELECT report_datetime, target_date, weather, pop
+            FROM forecasts
+            WHERE office_code = ? AND area_code = ?
+        """, conn, params=(office_code, area_code))
+    finally:
+        conn.close()
+
+    # 予報が1件も無いと object 型になるので、観測側と同じ文字列型にそろえておく
+    df['target_date'] = df['target_date'].astype(str)
+    # 発表時刻は +09:00 付きなので、cycle_status と同じ日本時間の naive な時刻にそろえる
+    df['report_datetime'] = (
+        pd.to_datetime(df['report_datetime'], utc=True)
+        .dt.tz_convert('Asia/Tokyo')
+        .dt.tz_localize(None)
+        .astype('datetime64[ns]')
+    )
+    df['rain_flag'] = (df['weather'].str.contains('雨') | (df['pop'].fillna(0) >= RAIN_POP)).astype('int8')
+    df['snow_flag'] = df['weather'].str.contains('雪').astype('int8')
+    return df.sort_values('report_datetime', ignore_index=True)
+
+
+def iter_cycle_status(status_db, chunksize=CHUNK_SIZE):
+    # 時刻順にチャンクで読むので、全件をメモリに載せない
+    conn = sqlite3.connect(status_db)
+    try:
+        cursor = conn.execute("""
+            SELECT id, num_bikes_parkable, num_bikes_now, num_bikes_rentalable, num_bikes_limit, timestamp
+            FROM cycle_status
+            ORDER BY timestamp
+        """)
+        columns = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=columns)
+    finally:
+        conn.close()
+
+
+def join_chunk(df_status, df_forecast):
+    """1チャンク分の観測に予報を as-of で結合する"""
+    df = df_status.copy()
+    df['target_date'] = df['timestamp'].str[:10].astype(str)
+    df['timestamp'] = pd.to_datetime(df['timestamp']).astype('datetime64[ns]')
+    df = pd.merge_asof(
+        df.sort_values('timestamp'),
+        df_forecast,
+        left_on='timestamp',
+        right_on='report_datetime',
+        by='target_date',
+        direction='backward',
+    )
+    return df.drop(columns=['target_date'])
+
+
+def iter_joined(status_db, weather_db=WEATHER_DB, office_code=TOKYO_OFFICE, area_code=TOKYO_AREA, chunksize=CHUNK_SIZE):
+    """cycle_status を1回なめながら、予報付きのチャンクを順に返す"""
+    df_forecast = load_forecast_features(weather_db, office_code, area_code)
+    for df_status in iter_cycle_status(status_db, chunksize):
+        yield join_chunk(df_status, df_forecast)
+
+
+def write_joined(status_db, out_db, weather_db=WEATHER_DB, table="cycle_weather", **kwargs):
+    conn = sqlite3.connect(out_db)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        total = 0
+        for df in iter_joined(status_db, weather_db, **kwargs):
+            df.to_sql(table, conn, if_exists='append', index=False)
+            total += len(df)
+        conn.commit()
+    finally:
+        conn.close()
+    return total
+
+
+def usage_by_weather(status_db, weather_db=WEATHER_DB, master_db=cycle.MASTER_DB, **kwargs):
+    """雨の有無 × 標高エリアごとの平均貸出可能台数。チャンクごとの合計だけを持つ"""
+    conn = sqlite3.connect(master_db)
+    try:
+        area_types = dict(conn.execute("SELECT id, area_type FROM port_master"))
+    finally:
+        conn.close()
+
+    totals = None
+    for df in iter_joined(status_db, weather_db, **kwargs):
+        df['area_type'] = df['id'].map(area_types)
+        df['rain_flag'] = df['rain_flag'].fillna(-1).astype('int8')  # -1: 予報なし
+        part = df.groupby(['rain_flag', 'area_type'])['num_bikes_rentalable'].agg(['sum', 'count'])
+        totals = part if totals is None else totals.add(part, fill_value=0)
+
+    if totals is None:
+        return pd.DataFrame(columns=['rain_flag', 'area_type', 'mean_rentalable', 'observations'])
+    result = totals.reset_index()
+    result['mean_rentalable'] = result['sum'] / result['count']
+    return result.rename(columns={'count': 'observations'})[['rain_flag', 'area_type', 'mean_rentalable', 'observations']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="貸出状況と東京地方の天気予報を時刻で結合する")
+    parser.add_argument("--db", default=cycle.STATUS_DBS["default"])
+    parser.add_argument("--weather-db", default=WEATHER_DB)
+    parser.add_argument("--out", help="結合結果を書き出す SQLite ファイル")
+    args = parser.parse_args()
+
+    if args.out:
+        total = write_joined(args.db, args.out, args.weather_db)
+        print(f"{total} 行を {args.out} に書き出しました")
+    else:
+        print(usage_by_weather(args.db, args.weather_db).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()